@@ -1,59 +1,248 @@
 import pandas as pd
 import numpy as np
+import bottleneck as bn
+
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+    # 未安装 numba 时退化为普通 Python 函数 (慢但结果一致)
+    def njit(*args, **kwargs):
+        def wrapper(func):
+            return func
+        if args and callable(args[0]):
+            return args[0]
+        return wrapper
+
+
+def _rsi_numpy(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    无 numba 时的向量化 RSI，与 _rsi_wilder 同为 Wilder 平滑口径：
+    ewm(alpha=1/period, adjust=False) 的递推 avg = (1-a)*avg + a*x
+    正是 Wilder 的 (avg*(n-1) + x)/n，两条路径的数值保持一致。
+    涨跌幅用 np.subtract + np.maximum 在连续缓冲区上算，
+    避免 Series.diff/where/fillna 产生的四个中间 Series
+    """
+    if close.size <= period:
+        return np.full(close.size, np.nan)
+
+    delta = np.empty_like(close)
+    delta[0] = 0.0
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    gain = np.maximum(delta, 0.0)
+    loss = np.maximum(-delta, 0.0)
+    alpha = 1.0 / period
+
+    def wilder_avg(x: np.ndarray) -> np.ndarray:
+        # Wilder 用前 period 个涨跌幅的均值打底，之后才走指数递推；
+        # 把打底值写进序列、其前置 NaN，ewm(adjust=False) 的递推就逐点等同
+        seed = x[1:period + 1].mean()
+        s = pd.Series(x)
+        s.iloc[:period] = np.nan
+        s.iloc[period] = seed
+        return s.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    avg_gain = wilder_avg(gain)
+    avg_loss = wilder_avg(loss)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100.0 - 100.0 / (1.0 + rs)
+    # avg_loss == 0 (纯涨或一路平盘) 时 numba 核的约定是 100，
+    # 而 0/0 这里会算出 NaN，对齐该约定；预热段 (avg_loss 为 NaN) 保持 NaN
+    return np.where(avg_loss > 0, rsi, np.where(np.isnan(avg_loss), np.nan, 100.0))
+
+
+@njit(cache=True)
+def _rsi_wilder(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder 平滑 RSI 的单遍递推实现 (avg = (avg*(n-1) + x) / n)
+    """
+    n = close.size
+    out = np.full(n, np.nan)
+    if n <= period:
+        return out
+
+    # 用前 period 个涨跌幅初始化平均涨/跌
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            avg_gain += d
+        else:
+            avg_loss -= d
+    avg_gain /= period
+    avg_loss /= period
+    if avg_loss > 0:
+        out[period] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    else:
+        out[period] = 100.0
+
+    for i in range(period + 1, n):
+        d = close[i] - close[i - 1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+        if avg_loss > 0:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        else:
+            out[i] = 100.0
+    return out
+
+
+@njit(cache=True)
+def _multi_roll(close, high, low, w_fast, w_slow, w_sr):
+    """
+    单遍融合核：一次遍历同时产出 快/慢 SMA (滑动和) 与
+    支撑/阻力位 (单调双端队列滑动 min/max)，数组只从内存读一次
+    """
+    n = close.size
+    sma_fast = np.full(n, np.nan)
+    sma_slow = np.full(n, np.nan)
+    sup = np.full(n, np.nan)
+    res = np.full(n, np.nan)
+
+    s_fast = 0.0
+    s_slow = 0.0
+    # 单调队列存下标 (预分配，qmin 递增保最小值，qmax 递减保最大值)
+    qmin = np.empty(n, np.int64)
+    qmax = np.empty(n, np.int64)
+    min_h = 0; min_t = 0
+    max_h = 0; max_t = 0
+
+    for i in range(n):
+        # 滑动和 SMA
+        s_fast += close[i]
+        if i >= w_fast:
+            s_fast -= close[i - w_fast]
+        if i >= w_fast - 1:
+            sma_fast[i] = s_fast / w_fast
+
+        s_slow += close[i]
+        if i >= w_slow:
+            s_slow -= close[i - w_slow]
+        if i >= w_slow - 1:
+            sma_slow[i] = s_slow / w_slow
+
+        # 滑动最小 (支撑位)
+        while min_t > min_h and low[qmin[min_t - 1]] >= low[i]:
+            min_t -= 1
+        qmin[min_t] = i
+        min_t += 1
+        if qmin[min_h] <= i - w_sr:
+            min_h += 1
+        if i >= w_sr - 1:
+            sup[i] = low[qmin[min_h]]
+
+        # 滑动最大 (阻力位)
+        while max_t > max_h and high[qmax[max_t - 1]] <= high[i]:
+            max_t -= 1
+        qmax[max_t] = i
+        max_t += 1
+        if qmax[max_h] <= i - w_sr:
+            max_h += 1
+        if i >= w_sr - 1:
+            res[i] = high[qmax[max_h]]
+
+    return sma_fast, sma_slow, sup, res
+
+
+if _HAS_NUMBA:
+    # 导入时用小数组跑一遍核函数，触发编译 (或加载 cache=True 的磁盘缓存)，
+    # JIT 开销落在进程启动而不是首个用户请求上
+    _warm = np.zeros(32, dtype=np.float32)
+    _rsi_wilder(_warm, 14)
+    _multi_roll(_warm, _warm, _warm, 5, 20, 20)
+    del _warm
+
 
 class TechnicalAnalyzer:
     def __init__(self, dataframe: pd.DataFrame):
         """
         初始化分析器
         :param dataframe: 包含 'Close', 'High', 'Low' 列的 DataFrame
+
+        注意: 这里只做浅拷贝 (共享底层数据块)。各 add_* 方法只新增指标列、
+        不修改原有列，因此调用方传入的 DataFrame 不会被改动。
         """
-        self.df = dataframe.copy()
+        self.df = dataframe.copy(deep=False)
+        # 价格精度远低于 float64，统一降到 float32：滚动指标是内存带宽瓶颈，
+        # 元素减半直接换来带宽/缓存收益，下游展示只保留 2 位小数不受影响
+        for c in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            if c in self.df.columns:
+                self.df[c] = self.df[c].astype(np.float32)
+
+        # 各 add_* 方法共享同一组 ndarray 视图，避免每个指标都重新抽取列。
+        # 所有指标核只读这些数组，不会写回。
+        self._close = self.df['Close'].to_numpy(copy=False) if 'Close' in self.df.columns else None
+        self._high = self.df['High'].to_numpy(copy=False) if 'High' in self.df.columns else None
+        self._low = self.df['Low'].to_numpy(copy=False) if 'Low' in self.df.columns else None
 
     def add_sma(self, period: int = 5):
         """
         计算简单移动平均线 (SMA)
         """
         col_name = f'SMA_{period}'
-        self.df[col_name] = self.df['Close'].rolling(window=period).mean()
+        self.df[col_name] = bn.move_mean(self._close, window=period, min_count=period)
         return self.df
 
     def add_rsi(self, period: int = 14):
         """
         计算相对强弱指数 (RSI)
         """
-        delta = self.df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).fillna(0)
-        loss = (-delta.where(delta < 0, 0)).fillna(0)
-
-        avg_gain = gain.rolling(window=period, min_periods=1).mean()
-        avg_loss = loss.rolling(window=period, min_periods=1).mean()
-
-        rs = avg_gain / avg_loss
-        self.df['RSI'] = 100 - (100 / (1 + rs))
+        if _HAS_NUMBA:
+            self.df['RSI'] = _rsi_wilder(self._close, period)
+        else:
+            self.df['RSI'] = _rsi_numpy(self._close, period)
         return self.df
 
     def add_atr(self, period: int = 14):
         """
         计算平均真实波幅 (ATR) - 用于确定止损和波动范围
         """
-        high = self.df['High']
-        low = self.df['Low']
-        close = self.df['Close']
-        
-        tr1 = high - low
-        tr2 = (high - close.shift()).abs()
-        tr3 = (low - close.shift()).abs()
-        
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        self.df['ATR'] = tr.rolling(window=period).mean()
+        h = self._high
+        l = self._low
+        c = self._close
+
+        # 前一日收盘价 (首日没有，置为 NaN)
+        pc = np.empty_like(c)
+        pc[0] = np.nan
+        pc[1:] = c[:-1]
+
+        tr = np.maximum(h - l, np.maximum(np.abs(h - pc), np.abs(l - pc)))
+        self.df['ATR'] = bn.move_mean(tr, window=period, min_count=period)
         return self.df
 
     def add_support_resistance(self, window: int = 20):
         """
         计算近期支撑位和阻力位 (基于过去N天的最低/最高点)
         """
-        self.df['Support_Level'] = self.df['Low'].rolling(window=window).min()
-        self.df['Resistance_Level'] = self.df['High'].rolling(window=window).max()
+        self.df['Support_Level'] = bn.move_min(self._low, window=window, min_count=window)
+        self.df['Resistance_Level'] = bn.move_max(self._high, window=window, min_count=window)
+        return self.df
+
+    def add_all_rolling(self, sma_fast: int = 5, sma_slow: int = 20, sr_window: int = 20):
+        """
+        一次遍历同时计算 SMA_{fast}/SMA_{slow}/Support_Level/Resistance_Level
+        (等价于依次调用 add_sma 两次 + add_support_resistance，但只扫一遍数组)
+        """
+        if not _HAS_NUMBA:
+            self.add_sma(sma_fast)
+            self.add_sma(sma_slow)
+            self.add_support_resistance(sr_window)
+            return self.df
+
+        f, s, sup, res = _multi_roll(self._close, self._high, self._low, sma_fast, sma_slow, sr_window)
+        # 四列一次 assign 写入，只触发一次列插入/块整理
+        self.df = self.df.assign(**{
+            f'SMA_{sma_fast}': f,
+            f'SMA_{sma_slow}': s,
+            'Support_Level': sup,
+            'Resistance_Level': res,
+        })
         return self.df
 
     def get_analysis(self) -> pd.DataFrame:
@@ -1,19 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
 from data_loader import DataLoader
 from analysis import TechnicalAnalyzer
 from llm_advisor import LLMAdvisor
 from user_profile import UserProfile
 from screener import Screener
 from trading_system import PaperTrader
-# 尝试导入 FutuTrader
-try:
-    from futu_trader import FutuTrader
-except ImportError:
-    FutuTrader = None
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from market_data_providers import probe_futu_quote
 
 # --- 页面基础配置 ---
@@ -25,7 +22,32 @@ st.set_page_config(
 )
 
 # --- 缓存：避免 Streamlit 重跑导致频繁请求触发限流 ---
-@st.cache_data(ttl=600, show_spinner=False)  # 10分钟缓存
+@st.cache_resource(show_spinner=False)
+def get_executor() -> ThreadPoolExecutor:
+    """
+    共享线程池：行情和新闻这类互相独立的 IO 请求并发发起，
+    冷缓存时总耗时从两次请求之和变成较慢的那一次
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource(show_spinner=False)
+def get_loader() -> DataLoader:
+    """
+    DataLoader 单例：免得每个缓存函数/每次重跑都重新构造一个
+    """
+    return DataLoader()
+
+@st.cache_resource(show_spinner=False)
+def get_paper_trader() -> PaperTrader:
+    """
+    PaperTrader 单例：portfolio.json 只在进程里读一次，
+    切换模式/新开会话不再重复读盘反序列化
+    """
+    return PaperTrader()
+
+# persist="disk"：行情缓存落盘，重启 streamlit 后上一轮看过的标的不用重新拉取
+# (DataFrame 的 attrs['data_source'] 会随 pickle 一起保存，UI 显示不受影响)
+@st.cache_data(ttl=3600, persist="disk", show_spinner=False)
 def cached_history(
     ticker: str,
     period: str,
@@ -35,7 +57,7 @@ def cached_history(
     futu_port: int,
     futu_enabled: bool,
 ) -> pd.DataFrame | None:
-    loader = DataLoader()
+    loader = get_loader()
     return loader.get_stock_history(
         ticker,
         period=period,
@@ -46,19 +68,185 @@ def cached_history(
         futu_enabled=futu_enabled,
     )
 
-@st.cache_data(ttl=600, show_spinner=False)
+# O(1) 的 DataFrame 缓存键：按 (形状, 末行日期, 末行收盘价) 代替整帧逐元素哈希。
+# 分析帧固定 tail(N) + reset_index，形状按周期恒定，末行日期才能区分跨日数据；
+# 再叠收盘价兜底同日的盘中刷新
+_df_hash = lambda d: (
+    d.shape,
+    str(d['Date'].iloc[-1]) if 'Date' in d.columns and len(d) else '',
+    float(d['Close'].iloc[-1]) if 'Close' in d.columns and len(d) else 0.0,
+)
+
+@st.cache_data(ttl=600, show_spinner=False, hash_funcs={pd.DataFrame: _df_hash})
+def cached_indicators(df: pd.DataFrame, ticker: str, period: str) -> pd.DataFrame:
+    """
+    指标流水线缓存：只要行情 df 没变 (按 O(1) 摘要哈希)，重跑脚本时直接复用结果，
+    避免每次聊天/控件交互都重算全部滚动指标
+    """
+    analyzer = TechnicalAnalyzer(df)
+    analyzer.add_all_rolling(sma_fast=5, sma_slow=20, sr_window=20)
+    analyzer.add_rsi(14)
+    analyzer.add_atr(14)
+    return analyzer.get_analysis()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_last_close(ticker: str, data_source: str) -> float | None:
+    """
+    持仓估值用的最新收盘价 (短缓存，1分钟内重跑不再请求网络)
+    """
+    loader = get_loader()
+    d = loader.get_stock_history(ticker, "1d", allow_fallback=False, data_source=data_source)
+    if d is not None and not d.empty:
+        # iat 一次 C 级取标量，避免 iloc[-1] 先物化整行再按标签取值
+        return float(d['Close'].iat[-1])
+    return None
+
+@st.cache_resource(show_spinner=False)
+def _go():
+    """
+    延迟加载 plotly (冷导入 ~200ms)：只有画图的代码路径才会触发，
+    且模块句柄被 cache_resource 持有，后续重跑零开销
+    """
+    import plotly.graph_objects as go
+    return go
+
+@st.cache_resource(show_spinner=False)
+def cached_advisor(api_key: str, base_url: str, model: str) -> LLMAdvisor:
+    """
+    复用 LLMAdvisor (及其底层 HTTP 客户端)：聊天流式输出期间脚本会反复重跑，
+    不缓存的话每个 chunk 都会重建一次 OpenAI 客户端/TLS 连接
+    """
+    return LLMAdvisor(api_key=api_key, base_url=base_url, model=model)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_last_prices(tickers: tuple, data_source: str) -> dict:
+    """
+    批量拉取持仓标的的最新收盘价：一次 yf.download 代替每股一次请求的
+    N+1 模式；批量结果缺失的标的再逐只回退
+    """
+    prices: dict = {}
+    if not tickers:
+        return prices
+    prices.update(get_loader().get_last_prices(list(tickers)))
+    for t in tickers:
+        if t not in prices:
+            try:
+                c = cached_last_close(t, data_source)
+                if c is not None:
+                    prices[t] = c
+            except Exception:
+                pass
+    return prices
+
+@st.cache_data(ttl=3600, persist="disk", show_spinner=False)
 def cached_news(ticker: str) -> list[dict]:
-    loader = DataLoader()
-    return loader.get_stock_news(ticker)
+    loader = get_loader()
+    news = loader.get_stock_news(ticker)
+    if news:
+        # 时间戳一次性批量转换并缓存，展示循环不再逐条调 pd.to_datetime
+        ts = pd.to_datetime(
+            [n.get('providerPublishTime') for n in news], unit='s', errors='coerce'
+        )
+        for n, t in zip(news, ts):
+            n['_ts'] = t.strftime('%Y-%m-%d %H:%M') if pd.notna(t) else ''
+    return news
 
 # OpenD 探测做短缓存，避免每次 Streamlit 重跑都尝试连接刷屏
 @st.cache_data(ttl=15, show_spinner=False)
 def cached_probe_futu(host: str, port: int) -> tuple[bool, str]:
     return probe_futu_quote(host, port)
 
+# 全池扫描要拉几十只股票的行情，结果落盘缓存；date_key 取到小时，
+# 同一小时内重复点击/其他会话点击直接命中 (下划线参数不参与哈希)
+@st.cache_data(ttl=24 * 3600, persist="disk", show_spinner=False)
+def run_screener_cached(date_key: str, _progress_callback=None) -> dict:
+    return Screener().run_screener(_progress_callback)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def build_context(ticker: str, close: float, rsi: float, ma5: float, sup: float, news_titles: tuple) -> str:
+    """
+    AI 对话的市场上下文：入参全是可哈希标量/元组，
+    行情和新闻没变时重跑直接命中缓存，f-string 和新闻拼接都不重做
+    """
+    news_summary = "\n".join(f"- {t}" for t in news_titles) if news_titles else "无最新新闻"
+    return f"""
+        Ticker: {ticker}
+        Price: {close:.2f}
+        RSI: {rsi:.2f}
+        MA5: {ma5:.2f}
+        Support: {sup:.2f}
+
+        Recent News Headlines:
+        {news_summary}
+        """
+
+def _norm_ticker(s: str) -> str:
+    """
+    规范化代码输入：去空白+大写。ticker 是各级缓存的键，
+    " aapl" 和 "AAPL" 必须落在同一个缓存条目上
+    """
+    return (s or "").strip().upper()
+
+# 侧边栏周期 -> 交易日数。行情始终按 "2y" 拉取并缓存，
+# 切换周期只做本地切片，不再触发网络请求
+_PERIOD_DAYS = {"1mo": 22, "3mo": 66, "6mo": 132, "1y": 252}
+
+@st.cache_data(ttl=600, show_spinner=False, hash_funcs={pd.DataFrame: _df_hash})
+def build_price_figure(plot_df: pd.DataFrame, ticker: str, period: str) -> dict:
+    """
+    构建 K线+均线图并缓存其 JSON spec：行情没变的重跑直接跳过
+    Plotly 的布局校验和整帧序列化。
+    ticker/period 显式入键：_df_hash 只摘要帧内容，不同标的末行
+    日期/收盘价偶尔撞车时不能串图
+    """
+    go = _go()
+    # 直接给 Plotly 传 ndarray，走它的 numpy 批量序列化路径
+    x_dates = plot_df['Date'].to_numpy()
+    fig = go.Figure()
+
+    # K线 (红涨绿跌，符合中国用户习惯，或根据国际惯例调整颜色)
+    fig.add_trace(go.Candlestick(
+        x=x_dates,
+        open=plot_df['Open'].to_numpy(), high=plot_df['High'].to_numpy(),
+        low=plot_df['Low'].to_numpy(), close=plot_df['Close'].to_numpy(),
+        name='Price',
+        increasing_line_color='#ef5350', # 红
+        decreasing_line_color='#26a69a'  # 绿
+    ))
+
+    # 均线
+    fig.add_trace(go.Scatter(x=x_dates, y=plot_df['SMA_5'].to_numpy(), line=dict(color='orange', width=1), name='MA5'))
+    fig.add_trace(go.Scatter(x=x_dates, y=plot_df['SMA_20'].to_numpy(), line=dict(color='blue', width=1), name='MA20'))
+
+    fig.update_layout(
+        xaxis_title=None,
+        yaxis_title=None,
+        height=500,
+        margin=dict(l=0, r=0, t=20, b=0),
+        legend=dict(orientation="h", y=1.02, x=0),
+        template="plotly_white", # 使用白色简约模板
+        hovermode="x unified"
+    )
+    return fig.to_dict()
+
+def _downsample_ohlc(df: pd.DataFrame, max_points: int = 1500) -> pd.DataFrame:
+    """
+    图表降采样：行数超过阈值时按周/月重采样成 OHLC，
+    减小 Plotly 的 JSON 载荷和前端重绘开销 (日线 1y 以内不受影响)
+    """
+    if len(df) <= max_points or 'Date' not in df.columns:
+        return df
+    rule = 'W' if len(df) < 10000 else 'ME'
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+    for c in ('SMA_5', 'SMA_20'):
+        if c in df.columns:
+            agg[c] = 'last'
+    return df.resample(rule, on='Date').agg(agg).dropna(subset=['Close']).reset_index()
+
 # --- 简洁 CSS 样式 (仅做微调) ---
-def local_css():
-    st.markdown("""
+# CSS 常量在模块导入时构建一次；注意 <style> 元素必须每次重跑都重新发出，
+# 否则 Streamlit 会把上一轮未复现的元素从页面移除、样式随之丢失
+_CSS = """
     <style>
         /* 侧边栏微调 */
         section[data-testid="stSidebar"] {
@@ -92,7 +280,10 @@ def local_css():
             border-bottom: 2px solid #0068c9;
         }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def local_css():
+    st.markdown(_CSS, unsafe_allow_html=True)
 
 local_css()
 
@@ -102,21 +293,9 @@ if "messages" not in st.session_state:
 if "screener_results" not in st.session_state:
     st.session_state.screener_results = None
 if "trader" not in st.session_state:
-    st.session_state.trader = PaperTrader()
+    st.session_state.trader = get_paper_trader()
 if "trading_mode" not in st.session_state:
     st.session_state.trading_mode = "Paper"
-if "last_df" not in st.session_state:
-    st.session_state.last_df = None
-if "last_ticker" not in st.session_state:
-    st.session_state.last_ticker = None
-if "last_period" not in st.session_state:
-    st.session_state.last_period = None
-if "last_data_source" not in st.session_state:
-    st.session_state.last_data_source = None
-if "last_futu_host" not in st.session_state:
-    st.session_state.last_futu_host = None
-if "last_futu_port" not in st.session_state:
-    st.session_state.last_futu_port = None
 if "market_data_source" not in st.session_state:
     # 默认优先富途；如果探测失败会在运行时自动降级
     st.session_state.market_data_source = "auto"
@@ -125,6 +304,71 @@ if "futu_host" not in st.session_state:
 if "futu_port" not in st.session_state:
     st.session_state.futu_port = int(os.getenv("FUTU_OPEND_PORT", "11111"))
 
+@st.fragment
+def chat_fragment(advisor, context_str: str, user_principles: str):
+    """
+    AI 聊天区：用 st.fragment 把重跑范围限制在本函数内，
+    提交问题/流式输出时不再重跑侧边栏、指标计算和图表
+    """
+    for msg in st.session_state.messages:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
+    if prompt := st.chat_input("输入问题..."):
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            full_res = ""
+            stream = advisor.get_chat_response(st.session_state.messages, context_data=context_str, user_profile=user_principles)
+            # 限流刷新：不论 token 到达节奏如何，重绘频率都压在 20Hz 以内；
+            # 先把 token 攒到 >=16 字符再看计时器，省掉逐 token 的 monotonic 调用
+            last_flush = 0.0
+            pending = 0
+            for chunk in stream:
+                full_res += chunk
+                pending += len(chunk)
+                if pending < 16:
+                    continue
+                now = time.monotonic()
+                if now - last_flush > 0.05:
+                    placeholder.markdown(full_res + "▌")
+                    last_flush = now
+                    pending = 0
+            placeholder.markdown(full_res)
+        st.session_state.messages.append({"role": "assistant", "content": full_res})
+        # 历史只留最近 30 条：每轮对话都会把全量历史重新渲染并发给 LLM，
+        # 不截断的话会话越长重跑越慢、token 越烧越多
+        if len(st.session_state.messages) > 30:
+            st.session_state.messages = st.session_state.messages[-30:]
+
+@st.fragment
+def order_fragment(trader, ticker: str, last_close: float):
+    """
+    下单面板：改价格/数量触发的重跑只限于本 fragment，
+    不再重算指标和图表；成交后 st.rerun(scope="app") 让账户概览同步刷新
+    """
+    with st.container(border=True):
+        o_ticker = _norm_ticker(st.text_input("代码", value=ticker))
+        o_action = st.radio("方向", ["买入", "卖出"], horizontal=True)
+
+        # 获取参考价
+        ref_price = last_close if o_ticker == ticker else 0.0
+
+        o_price = st.number_input("价格", value=float(ref_price) if ref_price else 0.0, step=0.1)
+        o_qty = st.number_input("数量", value=100, step=100)
+
+        if st.button("提交订单", type="primary", use_container_width=True):
+            if "买入" in o_action:
+                ok, msg = trader.buy(o_ticker, o_qty, o_price)
+            else:
+                ok, msg = trader.sell(o_ticker, o_qty, o_price)
+
+            if ok: st.success(msg); st.rerun(scope="app")
+            else: st.error(msg)
+
 def main():
     profile = UserProfile()
     trader = st.session_state.trader
@@ -145,12 +389,18 @@ def main():
         if mode != st.session_state.trading_mode:
             st.session_state.trading_mode = mode
             if mode == "Paper":
-                st.session_state.trader = PaperTrader()
+                st.session_state.trader = get_paper_trader()
                 st.rerun()
             elif mode.startswith("Futu"):
                 pass
 
         if st.session_state.trading_mode.startswith("Futu"):
+            # 只有真正切到富途模式才导入 (不用富途的用户不付这笔导入开销)
+            try:
+                from futu_trader import FutuTrader
+            except ImportError:
+                FutuTrader = None
+
             futu_host = st.text_input("OpenD Host", "127.0.0.1")
             futu_port = st.number_input("OpenD Port", 11111)
             futu_pwd = st.text_input("交易解锁密码", type="password")
@@ -170,7 +420,7 @@ def main():
         st.divider()
         
         st.markdown("### 标的选择")
-        ticker = st.text_input("股票代码", value="AAPL", help="美股: AAPL; 港股: 0700.HK; A股: 600519.SS").upper()
+        ticker = _norm_ticker(st.text_input("股票代码", value="AAPL", help="美股: AAPL; 港股: 0700.HK; A股: 600519.SS"))
         period = st.select_slider("时间周期", options=["1mo", "3mo", "6mo", "1y"], value="6mo")
         offline_mode = st.checkbox("离线模式（使用本地模拟数据）", value=False, help="当网络限流/不可用时，用 data/sample_data.csv 演示")
         st.markdown("### 行情源")
@@ -225,33 +475,33 @@ def main():
     with tab_analysis:
         # 1. 获取数据
         with st.spinner('加载数据...'):
-            need_refresh = (
-                refresh_now
-                or (st.session_state.last_df is None)
-                or (st.session_state.last_ticker != ticker)
-                or (st.session_state.last_period != period)
-                or (st.session_state.last_data_source != data_source)
-                or (st.session_state.last_futu_host != st.session_state.futu_host)
-                or (st.session_state.last_futu_port != st.session_state.futu_port)
+            # 不再手工维护 last_* 失效状态 —— cached_history 本身就按参数做键，
+            # 参数没变时命中缓存是 O(1)；"刷新"按钮改为显式清空缓存
+            if refresh_now:
+                cached_history.clear()
+            # 行情和新闻并发拉取 (两者都命中缓存时 submit 开销可忽略)
+            ex = get_executor()
+            fut_df = ex.submit(
+                cached_history,
+                ticker,
+                "2y",
+                offline_mode,
+                data_source,
+                st.session_state.futu_host,
+                st.session_state.futu_port,
+                ok if data_source == "auto" else True,
             )
-            if need_refresh:
-                df = cached_history(
-                    ticker,
-                    period,
-                    offline_mode,
-                    data_source,
-                    st.session_state.futu_host,
-                    st.session_state.futu_port,
-                    ok if data_source == "auto" else True,
-                )
-                st.session_state.last_df = df
-                st.session_state.last_ticker = ticker
-                st.session_state.last_period = period
-                st.session_state.last_data_source = data_source
-                st.session_state.last_futu_host = st.session_state.futu_host
-                st.session_state.last_futu_port = st.session_state.futu_port
-            else:
-                df = st.session_state.last_df
+            # 新闻只在标的变化时重新取 (聊天由 fragment 隔离，本身不会走到这里)
+            fut_news = None
+            if st.session_state.get("news_cache_key") != ticker:
+                fut_news = ex.submit(cached_news, ticker)
+            df_full = fut_df.result()
+
+            # 按选中的周期做本地切片 (保留 attrs 以显示数据源)
+            df = None
+            if df_full is not None and not df_full.empty:
+                df = df_full.tail(_PERIOD_DAYS.get(period, 132)).reset_index(drop=True)
+                df.attrs = df_full.attrs
         
         if df is None or df.empty:
             st.error(f"无法获取 {ticker} 数据。请检查代码格式，或稍后再试（可能被数据源限流）。")
@@ -262,57 +512,33 @@ def main():
         used_source = getattr(df, "attrs", {}).get("data_source", "unknown")
         st.caption(f"行情源：{used_source}")
 
-        # 获取新闻
-        news_items = cached_news(ticker)
-
-        # 2. 技术分析 (分步调用以防报错)
-        analyzer = TechnicalAnalyzer(df)
-        analyzer.add_sma(5)
-        analyzer.add_sma(20)
-        analyzer.add_rsi(14)
-        analyzer.add_atr(14)
-        analyzer.add_support_resistance(20)
-        
-        result = analyzer.get_analysis()
-        latest = result.iloc[-1]
-        prev = result.iloc[-2]
-        change = latest['Close'] - prev['Close']
-        change_pct = change / prev['Close'] * 100
+        # 获取新闻 (已在上面并发发起；标的没变就复用会话里的结果)
+        if fut_news is not None:
+            st.session_state.news_items = fut_news.result()
+            st.session_state.news_cache_key = ticker
+        news_items = st.session_state.get("news_items") or []
+
+        # 2. 技术分析 (结果按 df 内容缓存)
+        result = cached_indicators(df, ticker, period)
+        # 直接取底层 ndarray 读取末尾标量，避免每次重跑都物化两个完整 Series
+        arr = {c: result[c].to_numpy() for c in ('Close', 'RSI', 'SMA_5', 'Support_Level', 'Resistance_Level')}
+        last_close = float(arr['Close'][-1])
+        prev_close = float(arr['Close'][-2])
+        change = last_close - prev_close
+        change_pct = change / prev_close * 100
 
         # 3. 关键指标
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("最新价", f"${latest['Close']:.2f}", f"{change_pct:.2f}%")
-        c2.metric("RSI (14)", f"{latest['RSI']:.2f}", help=">70超买, <30超卖")
-        c3.metric("支撑位", f"${latest['Support_Level']:.2f}")
-        c4.metric("阻力位", f"${latest['Resistance_Level']:.2f}")
+        c1.metric("最新价", f"${last_close:.2f}", f"{change_pct:.2f}%")
+        c2.metric("RSI (14)", f"{arr['RSI'][-1]:.2f}", help=">70超买, <30超卖")
+        c3.metric("支撑位", f"${arr['Support_Level'][-1]:.2f}")
+        c4.metric("阻力位", f"${arr['Resistance_Level'][-1]:.2f}")
 
-        # 4. 图表 (简约风格)
-        fig = go.Figure()
-        
-        # K线 (红涨绿跌，符合中国用户习惯，或根据国际惯例调整颜色)
-        fig.add_trace(go.Candlestick(
-            x=result['Date'],
-            open=result['Open'], high=result['High'],
-            low=result['Low'], close=result['Close'],
-            name='Price',
-            increasing_line_color='#ef5350', # 红
-            decreasing_line_color='#26a69a'  # 绿
-        ))
-        
-        # 均线
-        fig.add_trace(go.Scatter(x=result['Date'], y=result['SMA_5'], line=dict(color='orange', width=1), name='MA5'))
-        fig.add_trace(go.Scatter(x=result['Date'], y=result['SMA_20'], line=dict(color='blue', width=1), name='MA20'))
-        
-        fig.update_layout(
-            xaxis_title=None,
-            yaxis_title=None,
-            height=500,
-            margin=dict(l=0, r=0, t=20, b=0),
-            legend=dict(orientation="h", y=1.02, x=0),
-            template="plotly_white", # 使用白色简约模板
-            hovermode="x unified"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        # 4. 图表 (简约风格；大周期先降采样，指标/AI 上下文仍用全分辨率 result)
+        # 画图只需要这几列，先裁掉 RSI/ATR 等无关列再序列化
+        plot_cols = ['Date', 'Open', 'High', 'Low', 'Close', 'SMA_5', 'SMA_20']
+        plot_df = _downsample_ohlc(result[[c for c in plot_cols if c in result.columns]])
+        st.plotly_chart(_go().Figure(build_price_figure(plot_df, ticker, period)), use_container_width=True)
 
         # 5. 新闻情报
         st.subheader("📰 市场情报")
@@ -320,7 +546,7 @@ def main():
             with st.expander(f"查看 {ticker} 最新资讯 ({len(news_items)}条)", expanded=True):
                 for item in news_items[:3]: # 只显示前3条
                     st.markdown(f"**[{item.get('title')}]({item.get('link')})**")
-                    st.caption(f"来源: {item.get('publisher')} | 时间: {pd.to_datetime(item.get('providerPublishTime'), unit='s')}")
+                    st.caption(f"来源: {item.get('publisher')} | 时间: {item.get('_ts', '')}")
         else:
             st.info("暂无相关新闻")
 
@@ -328,65 +554,39 @@ def main():
 
         # 6. AI 顾问
         st.subheader("AI 分析建议")
-        
-        for msg in st.session_state.messages:
-            with st.chat_message(msg["role"]):
-                st.markdown(msg["content"])
-        
-        # 构建包含新闻的上下文
-        news_summary = "\n".join([f"- {n['title']}" for n in news_items[:5]]) if news_items else "无最新新闻"
-        
-        context_str = f"""
-        Ticker: {ticker}
-        Price: {latest['Close']:.2f}
-        RSI: {latest['RSI']:.2f}
-        MA5: {latest['SMA_5']:.2f}
-        Support: {latest['Support_Level']:.2f}
-        
-        Recent News Headlines:
-        {news_summary}
-        """
-        
+
+        # 构建包含新闻的上下文 (按标量键缓存，行情/新闻没变就不重拼)
+        context_str = build_context(
+            ticker,
+            round(last_close, 2),
+            round(float(arr['RSI'][-1]), 2),
+            round(float(arr['SMA_5'][-1]), 2),
+            round(float(arr['Support_Level'][-1]), 2),
+            tuple(n.get('title', '') for n in news_items[:5]),
+        )
+
         user_principles = profile.get_principles_text()
-        advisor = LLMAdvisor(api_key=api_key, base_url=base_url, model=model_name)
-
-        if prompt := st.chat_input("输入问题..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user"):
-                st.markdown(prompt)
-
-            with st.chat_message("assistant"):
-                placeholder = st.empty()
-                full_res = ""
-                stream = advisor.get_chat_response(st.session_state.messages, context_data=context_str, user_profile=user_principles)
-                for chunk in stream:
-                    full_res += chunk
-                    placeholder.markdown(full_res + "▌")
-                placeholder.markdown(full_res)
-            st.session_state.messages.append({"role": "assistant", "content": full_res})
+        advisor = cached_advisor(api_key, base_url, model_name)
+        chat_fragment(advisor, context_str, user_principles)
 
     # === Tab 2: 交易终端 (简洁版) ===
     with tab_trading:
         current_mode = st.session_state.trading_mode
-        loader = DataLoader()
-        
+
         try:
             acc = trader.get_account()
         except Exception as e:
             st.error(f"获取账户失败: {e}")
             st.stop()
         
-        # 实时计算
+        # 实时计算 (一次批量请求拿到所有持仓的现价)
         current_prices = {}
         if acc.positions:
-            for t in acc.positions.keys():
-                if t == ticker:
-                    current_prices[t] = latest['Close']
-                else:
-                    try:
-                        d = loader.get_stock_history(t, "1d", allow_fallback=False, data_source=data_source)
-                        if d is not None: current_prices[t] = d.iloc[-1]['Close']
-                    except: pass
+            if ticker in acc.positions:
+                current_prices[ticker] = last_close
+            tickers_to_fetch = tuple(sorted(t for t in acc.positions if t != ticker))
+            if tickers_to_fetch:
+                current_prices.update(cached_last_prices(tickers_to_fetch, data_source))
         
         total_val = acc.total_value(current_prices)
         
@@ -403,38 +603,34 @@ def main():
         
         with col_order:
             st.markdown("#### 下单")
-            with st.container(border=True):
-                o_ticker = st.text_input("代码", value=ticker).upper()
-                o_action = st.radio("方向", ["买入", "卖出"], horizontal=True)
-                
-                # 获取参考价
-                ref_price = latest['Close'] if o_ticker == ticker else 0.0
-                
-                o_price = st.number_input("价格", value=float(ref_price) if ref_price else 0.0, step=0.1)
-                o_qty = st.number_input("数量", value=100, step=100)
-                
-                if st.button("提交订单", type="primary", use_container_width=True):
-                    if "买入" in o_action:
-                        ok, msg = trader.buy(o_ticker, o_qty, o_price)
-                    else:
-                        ok, msg = trader.sell(o_ticker, o_qty, o_price)
-                    
-                    if ok: st.success(msg); st.rerun()
-                    else: st.error(msg)
+            order_fragment(trader, ticker, last_close)
 
         with col_pos:
             st.markdown("#### 持仓明细")
             if acc.positions:
-                pos_list = []
-                for t, p in acc.positions.items():
-                    curr = current_prices.get(t, p['avg_cost'])
-                    pnl = (curr - p['avg_cost']) * p['qty']
-                    pnl_pct = (curr - p['avg_cost']) / p['avg_cost'] * 100 if p['avg_cost'] > 0 else 0
-                    pos_list.append({
-                        "代码": t, "数量": p['qty'], "成本": f"{p['avg_cost']:.2f}", 
-                        "现价": f"{curr:.2f}", "浮盈": f"{pnl:+.2f} ({pnl_pct:+.2f}%)"
-                    })
-                st.dataframe(pd.DataFrame(pos_list), use_container_width=True, hide_index=True)
+                # 向量化构建持仓表：一次性对 qty/cost/curr 数组做算术，保持数值列可排序
+                tickers_held, qty, cost = acc.positions_arrays()
+                curr = np.array([current_prices.get(t, c) for t, c in zip(tickers_held, cost)], dtype=np.float64)
+                mkt_val = curr * qty
+                pnl = (curr - cost) * qty
+                pnl_pct = np.where(cost > 0, (curr - cost) / np.where(cost > 0, cost, 1.0) * 100, 0.0)
+                df_pos = pd.DataFrame({
+                    "代码": tickers_held, "数量": qty, "成本": cost,
+                    "现价": curr, "市值": mkt_val, "浮盈": pnl, "浮盈%": pnl_pct
+                })
+                # 保持数值 dtype，让 Arrow 走列式序列化，格式化交给前端列配置
+                st.dataframe(
+                    df_pos,
+                    column_config={
+                        "数量": st.column_config.NumberColumn(format="%.0f"),
+                        "成本": st.column_config.NumberColumn(format="%.2f"),
+                        "现价": st.column_config.NumberColumn(format="%.2f"),
+                        "市值": st.column_config.NumberColumn(format="%.2f"),
+                        "浮盈": st.column_config.NumberColumn(format="%+.2f"),
+                        "浮盈%": st.column_config.NumberColumn(format="%+.2f%%"),
+                    },
+                    use_container_width=True, hide_index=True
+                )
             else:
                 st.caption("暂无持仓")
 
@@ -444,13 +640,23 @@ def main():
         with c1: st.info("扫描美股、港股及A股热门标的，寻找交易机会。")
         with c2: 
             if st.button("开始扫描", use_container_width=True):
-                screener = Screener()
                 bar = st.progress(0)
                 txt = st.empty()
+                # 限流进度更新：每次控件刷新都是一次前端往返，
+                # 整数百分比有变化且距上次超过 100ms (或最后一个) 才真正刷新
+                _last_prog = [0.0, -1]
                 def prog(c, t, tic):
-                    bar.progress(int(c/t*100))
-                    txt.caption(f"正在分析: {tic}")
-                st.session_state.screener_results = screener.run_screener(prog)
+                    now = time.monotonic()
+                    p = int(c/t*100)
+                    if c + 1 == t or (p != _last_prog[1] and now - _last_prog[0] > 0.1):
+                        bar.progress(p)
+                        txt.caption(f"正在分析: {tic}")
+                        _last_prog[0] = now
+                        _last_prog[1] = p
+                # 缓存命中 (同一小时内已扫过) 时秒回，进度回调不会被触发
+                st.session_state.screener_results = run_screener_cached(
+                    time.strftime("%Y-%m-%d-%H"), prog
+                )
                 bar.empty()
                 txt.empty()
 
@@ -1,47 +1,95 @@
 import pandas as pd
 import os
 import time
+from functools import lru_cache
 from typing import Optional, List
 
 import yfinance as yf
 
 from market_data_providers import (
     AlphaVantageProvider,
-    FutuQuoteProvider,
+    MultiProviderFetcher,
     StooqProvider,
     YahooFinanceProvider,
+    get_futu_quote_provider,
 )
 
+# Futu 市场前缀 -> Yahoo 后缀 (美股无后缀)
+_FUTU_PREFIX_TO_SUFFIX = {"US": "", "HK": ".HK", "SH": ".SS", "SZ": ".SZ"}
+
+@lru_cache(maxsize=1024)
+def _normalize_ticker(ticker: str) -> str:
+    """
+    兼容用户输入的多种代码格式：
+    - BotInvest / Yahoo: AAPL, 0700.HK, 600519.SS, 300750.SZ
+    - Futu: US.AAPL, HK.00700, SH.600519, SZ.300750
+
+    纯字符串映射且输入集合很小 (股票池 + 用户输入)，lru_cache 后
+    热路径 (批量报价/选股循环里每次请求都会调) 变成一次字典命中
+    """
+    t = (ticker or "").strip().upper()
+    if not t:
+        return t
+
+    # Futu -> Yahoo：前缀查表代替逐个 if/replace
+    prefix, dot, code = t.partition(".")
+    if dot:
+        suffix = _FUTU_PREFIX_TO_SUFFIX.get(prefix)
+        if suffix is not None:
+            if prefix == "HK":
+                code = code.lstrip("0") or "0"
+            return code + suffix
+
+    return t
+
+
+# 本地行情缓存：~/.botinvest/cache/{ticker}_{period}_{interval}.parquet
+# 当天内重复请求 (典型是选股器换小时重扫) 直接读盘 (~ms)，不再走网络
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".botinvest", "cache")
+_CACHE_TTL_SECONDS = 24 * 3600
+
+
+def _history_cache_path(ticker: str, period: str, interval: str) -> str:
+    safe = ticker.replace(".", "_").replace("/", "_")
+    return os.path.join(_CACHE_DIR, f"{safe}_{period}_{interval}.parquet")
+
+
+def _read_history_cache(path: str) -> Optional[pd.DataFrame]:
+    try:
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < _CACHE_TTL_SECONDS:
+            df = pd.read_parquet(path, engine="pyarrow")
+            if not df.empty:
+                df.attrs["data_source"] = "cache"
+                return df
+    except Exception:
+        pass
+    return None
+
+
+def _write_history_cache(path: str, df: pd.DataFrame) -> None:
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        df.to_parquet(path, engine="pyarrow", compression="snappy", index=False)
+    except Exception as e:
+        print(f"写入本地行情缓存失败: {e}")
+
+
+@lru_cache(maxsize=256)
+def _stock_fast_info(ticker: str) -> dict:
+    try:
+        return dict(yf.Ticker(ticker).fast_info)
+    except Exception as e:
+        print(f"获取 {ticker} 信息时出错: {e}")
+        return {}
+
+
 class DataLoader:
     def __init__(self):
         pass
 
     def normalize_ticker(self, ticker: str) -> str:
-        """
-        兼容用户输入的多种代码格式：
-        - BotInvest / Yahoo: AAPL, 0700.HK, 600519.SS, 300750.SZ
-        - Futu: US.AAPL, HK.00700, SH.600519, SZ.300750
-        """
-        t = (ticker or "").strip().upper()
-        if not t:
-            return t
-
-        # Futu -> Yahoo
-        if t.startswith("US."):
-            return t.replace("US.", "")
-        if t.startswith("HK."):
-            code = t.replace("HK.", "").lstrip("0")
-            if code == "":
-                code = "0"
-            return f"{code}.HK"
-        if t.startswith("SH."):
-            code = t.replace("SH.", "")
-            return f"{code}.SS"
-        if t.startswith("SZ."):
-            code = t.replace("SZ.", "")
-            return f"{code}.SZ"
-
-        return t
+        """规范化股票代码 (见模块级 _normalize_ticker)"""
+        return _normalize_ticker(ticker)
 
     def get_stock_history(
         self,
@@ -53,9 +101,14 @@ class DataLoader:
         futu_host: str | None = None,
         futu_port: int | None = None,
         futu_enabled: bool = True,
+        use_disk_cache: bool = False,
     ) -> Optional[pd.DataFrame]:
         """
         获取股票历史数据
+        :param use_disk_cache: 启用本地 parquet 缓存 (仅 auto 模式生效)。
+            只适合选股器这类当天内可复用的批量长周期拉取；
+            交互路径 (图表/估值) 有自己的 st.cache 层，开了反而会把
+            盘中数据冻一整天、让“刷新”按钮失效，保持默认关闭
         """
         ticker = self.normalize_ticker(ticker)
         ds = (data_source or "auto").lower().strip()
@@ -76,7 +129,7 @@ class DataLoader:
         # 1) 指定数据源
         if ds != "auto":
             if ds == "futu":
-                df = try_provider("futu", lambda: FutuQuoteProvider(host=futu_host, port=futu_port))
+                df = try_provider("futu", lambda: get_futu_quote_provider(futu_host, futu_port))
             elif ds == "yahoo":
                 df = try_provider("yahoo", lambda: YahooFinanceProvider())
             elif ds == "stooq":
@@ -90,45 +143,38 @@ class DataLoader:
                 return df
 
         # 2) 自动模式：优先 Futu Quote（避免 Yahoo 限流），然后 Yahoo，再 Stooq/AlphaVantage
+        # 调用方显式要求时才查本地 parquet 缓存 (指定数据源时同样跳过，避免串源)
+        cache_path = _history_cache_path(ticker, period, interval) if use_disk_cache else None
+        if cache_path is not None:
+            df = _read_history_cache(cache_path)
+            if df is not None:
+                return df
+
         df = None
         # Futu
         if futu_enabled:
-            df = try_provider("futu", lambda: FutuQuoteProvider(host=futu_host, port=futu_port))
+            df = try_provider("futu", lambda: get_futu_quote_provider(futu_host, futu_port))
             if df is not None:
+                if cache_path is not None:
+                    _write_history_cache(cache_path, df)
                 return df
 
-        # Yahoo：带简单重试，缓解偶发限流/网络抖动
+        # Yahoo / Stooq / AlphaVantage 并发竞速：顺序回退时坏源要先把超时耗完
+        # 才轮到备源，竞速直接取最先返回的有效结果 (限流重试在 Yahoo provider 内部)
+        providers = []
         try:
-            provider = YahooFinanceProvider()
-            last_err: Exception | None = None
-            for attempt in range(3):
-                try:
-                    df = provider.get_history(ticker, period=period, interval=interval)
-                    if df is not None and not df.empty:
-                        df.attrs["data_source"] = "yahoo"
-                        return df
-                    last_err = None
-                    break
-                except Exception as e:
-                    last_err = e
-                    msg = str(e)
-                    if "Too Many Requests" in msg or "Rate limited" in msg:
-                        time.sleep(1.5 * (attempt + 1))
-                        continue
-                    raise
-            if last_err is not None:
-                print(f"[yahoo] 获取失败: {last_err}")
+            providers.append(YahooFinanceProvider())
         except Exception as e:
-            print(f"[yahoo] 获取失败: {e}")
+            print(f"[yahoo] 初始化失败: {e}")
+        providers.append(StooqProvider())
+        providers.append(AlphaVantageProvider())
 
-        # Stooq（主要覆盖美股）
-        df = try_provider("stooq", lambda: StooqProvider())
-        if df is not None:
-            return df
-
-        # AlphaVantage（需要 key，主要覆盖美股）
-        df = try_provider("alphavantage", lambda: AlphaVantageProvider())
+        df = MultiProviderFetcher(providers).get_history_first_success(
+            ticker, period=period, interval=interval
+        )
         if df is not None:
+            if cache_path is not None:
+                _write_history_cache(cache_path, df)
             return df
 
         # 3) 本地演示数据（可选）
@@ -140,17 +186,44 @@ class DataLoader:
 
         return None
 
-    def get_stock_info(self, ticker: str) -> dict:
+    def get_last_prices(self, tickers: List[str]) -> dict:
         """
-        获取股票基本信息
+        批量获取多只股票的最新收盘价
+        一次 yf.download (内部线程池并发) 代替逐只请求，返回 {ticker: close}
         """
+        prices: dict = {}
+        if not tickers:
+            return prices
         try:
-            ticker = self.normalize_ticker(ticker)
-            stock = yf.Ticker(ticker)
-            return stock.info
+            symbols = [self.normalize_ticker(t) for t in tickers]
+            # multi_level_index=False: 单只代码时列直接是字段名，
+            # 新版 yfinance (>=0.2.51) 默认连单只也保留 (ticker, field) 两级列
+            data = yf.download(
+                symbols, period="2d", interval="1d",
+                group_by="ticker", threads=True, progress=False,
+                multi_level_index=False,
+            )
+            if data is None or data.empty:
+                return prices
+            for t, sym in zip(tickers, symbols):
+                try:
+                    closes = data[sym]['Close'] if len(symbols) > 1 else data['Close']
+                    c = closes.dropna()
+                    if len(c):
+                        prices[t] = float(c.iloc[-1])
+                except Exception:
+                    continue
         except Exception as e:
-            print(f"获取 {ticker} 信息时出错: {e}")
-            return {}
+            print(f"批量获取最新价失败: {e}")
+        return prices
+
+    def get_stock_info(self, ticker: str) -> dict:
+        """
+        获取股票基本信息
+        fast_info 只做轻量行情请求，避开 .info 整页抓取+解析；
+        进程内按代码 lru_cache，同一标的只请求一次
+        """
+        return _stock_fast_info(self.normalize_ticker(ticker))
 
     def get_stock_news(self, ticker: str) -> List[dict]:
         """
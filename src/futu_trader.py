@@ -9,6 +9,7 @@ except ImportError:
     TrdEnv = None
 
 from trading_system import BaseTrader, TradingAccount
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 class FutuTrader(BaseTrader):
@@ -16,6 +17,9 @@ class FutuTrader(BaseTrader):
     富途实盘交易适配器
     支持 美股(US) 和 港股(HK)
     """
+    # Futu 市场前缀 -> Yahoo 风格后缀 (美股无后缀)
+    _FUTU_TO_YAHOO = {'US': '', 'HK': '.HK', 'SH': '.SS', 'SZ': '.SZ'}
+
     def __init__(self, host='127.0.0.1', port=11111, pwd_unlock=None, market='US'):
         self.host = host
         self.port = port
@@ -31,76 +35,93 @@ class FutuTrader(BaseTrader):
 
     def _connect(self):
         try:
-            # 建立美股连接
-            self.ctx_us = OpenTradeContext(host=self.host, port=self.port, filter_trdmarket=TrdMarket.US)
-            # 建立港股连接
-            self.ctx_hk = OpenTradeContext(host=self.host, port=self.port, filter_trdmarket=TrdMarket.HK)
-            # 建立A股连接 (沪深)
-            self.ctx_cn = OpenTradeContext(host=self.host, port=self.port, filter_trdmarket=TrdMarket.CN)
-            
-            # 解锁交易 (如果提供了密码)
-            if self.pwd_unlock:
-                if self.ctx_us: self.ctx_us.unlock_trade(self.pwd_unlock)
-                if self.ctx_hk: self.ctx_hk.unlock_trade(self.pwd_unlock)
-                if self.ctx_cn: self.ctx_cn.unlock_trade(self.pwd_unlock)
-                
+            # 三个市场的握手/解锁互不依赖，并发建立，总耗时 = 最慢一条而不是三条之和
+            def open_one(market):
+                ctx = OpenTradeContext(host=self.host, port=self.port, filter_trdmarket=market)
+                if self.pwd_unlock and ctx:
+                    ctx.unlock_trade(self.pwd_unlock)
+                return ctx
+
+            with ThreadPoolExecutor(max_workers=3) as ex:
+                f_us = ex.submit(open_one, TrdMarket.US)
+                f_hk = ex.submit(open_one, TrdMarket.HK)
+                f_cn = ex.submit(open_one, TrdMarket.CN)
+                self.ctx_us = f_us.result()
+                self.ctx_hk = f_hk.result()
+                self.ctx_cn = f_cn.result()
+
             print("Futu OpenD 连接成功")
         except Exception as e:
             print(f"Futu OpenD 连接失败: {e}")
 
+        # 后缀 -> (交易上下文, Futu 代码前缀)，一次查表代替多级 if/elif
+        self._suffix_map = {
+            'HK': (self.ctx_hk, 'HK.'),
+            'SS': (self.ctx_cn, 'SH.'),
+            'SH': (self.ctx_cn, 'SH.'),
+            'SZ': (self.ctx_cn, 'SZ.'),
+        }
+
     def _get_ctx(self, ticker):
         """根据股票代码返回对应的上下文"""
-        if '.' not in ticker: # 默认美股，如 AAPL
+        code, dot, suffix = ticker.partition('.')
+        if not dot: # 默认美股，如 AAPL
             return self.ctx_us, "US." + ticker
-        
-        suffix = ticker.split('.')[-1]
-        if suffix in ['HK']:
-            return self.ctx_hk, "HK." + ticker.replace('.HK', '')
-        elif suffix in ['SS', 'SH']:
-            return self.ctx_cn, "SH." + ticker.replace('.SS', '').replace('.SH', '')
-        elif suffix in ['SZ']:
-            return self.ctx_cn, "SZ." + ticker.replace('.SZ', '')
-        else:
+
+        entry = self._suffix_map.get(suffix)
+        if entry is None:
             return self.ctx_us, "US." + ticker
+        ctx, prefix = entry
+        return ctx, prefix + code
+
+    def _query_market(self, ctx):
+        """
+        查询单个市场的 (现金, 持仓)，供 get_account 并发调用
+        """
+        cash = 0.0
+        positions = {}
+
+        # 1. 获取资金
+        ret, data = ctx.accinfo_query(trd_env=TrdEnv.REAL)
+        if ret == RET_OK:
+            # 简单累加各市场的现金 (注意：这里直接把数字加在一起了，实际上应该汇率换算)
+            # 富途通常会把总资产换算成一个币种，这里取 total_assets 比较方便
+            # 但为了简单，我们只取 'cash'
+            cash = data['cash'].sum()
+
+        # 2. 获取持仓
+        ret, pos_data = ctx.position_list_query(trd_env=TrdEnv.REAL)
+        if ret == RET_OK and len(pos_data):
+            # 整列取出成 ndarray 再 zip，避免 iterrows 逐行构造 Series
+            codes = pos_data['code'].to_numpy()
+            qtys = pos_data['qty'].to_numpy(dtype=float)
+            costs = pos_data['cost_price'].to_numpy(dtype=float)
+            for code, qty, cost in zip(codes, qtys, costs):
+                if qty <= 0: # 只显示多头
+                    continue
+                # 转换代码格式 Futu -> BotInvest
+                prefix, _, num = code.partition('.')
+                suffix = self._FUTU_TO_YAHOO.get(prefix)
+                ticker = num + suffix if suffix is not None else code
+                positions[ticker] = {
+                    "qty": float(qty),
+                    "avg_cost": float(cost)
+                }
+        return cash, positions
 
     def get_account(self) -> TradingAccount:
         acc = TradingAccount(0.0)
         acc.positions = {}
-        
-        contexts = [self.ctx_us, self.ctx_hk, self.ctx_cn]
-        
-        for ctx in contexts:
-            if ctx is None: continue
-            
-            # 1. 获取资金
-            ret, data = ctx.accinfo_query(trd_env=TrdEnv.REAL)
-            if ret == RET_OK:
-                # 简单累加各市场的现金 (注意：这里直接把数字加在一起了，实际上应该汇率换算)
-                # 富途通常会把总资产换算成一个币种，这里取 total_assets 比较方便
-                # 但为了简单，我们只取 'cash'
-                acc.cash += data['cash'].sum()
-
-            # 2. 获取持仓
-            ret, pos_data = ctx.position_list_query(trd_env=TrdEnv.REAL)
-            if ret == RET_OK:
-                for _, row in pos_data.iterrows():
-                    # 转换代码格式 Futu -> BotInvest
-                    code = row['code']
-                    qty = row['qty']
-                    cost = row['cost_price']
-                    
-                    # 简单映射回 BotInvest 格式
-                    if "US." in code: ticker = code.replace("US.", "")
-                    elif "HK." in code: ticker = code.replace("HK.", "") + ".HK"
-                    elif "SH." in code: ticker = code.replace("SH.", "") + ".SS"
-                    elif "SZ." in code: ticker = code.replace("SZ.", "") + ".SZ"
-                    else: ticker = code
-                    
-                    if qty > 0: # 只显示多头
-                        acc.positions[ticker] = {
-                            "qty": float(qty),
-                            "avg_cost": float(cost)
-                        }
+
+        contexts = [c for c in (self.ctx_us, self.ctx_hk, self.ctx_cn) if c is not None]
+        if not contexts:
+            return acc
+
+        # 每个市场两次 OpenD 往返，三个市场并发查询，墙钟时间降为最慢一个市场
+        with ThreadPoolExecutor(max_workers=len(contexts)) as ex:
+            for cash, positions in ex.map(self._query_market, contexts):
+                acc.cash += cash
+                acc.positions.update(positions)
         return acc
 
     def buy(self, ticker: str, qty: int, price: float):
@@ -1,4 +1,6 @@
 import os
+import queue
+import threading
 from openai import OpenAI
 
 class LLMAdvisor:
@@ -64,19 +66,45 @@ class LLMAdvisor:
         
         full_messages = [{"role": "system", "content": system_prompt}] + messages
 
-        try:
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=full_messages,
-                stream=True,
-                temperature=0.7
-            )
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+        # SSE 流在后台线程消费：网络读取和 UI 渲染不再互相等待。
+        # 渲染一帧期间到达的 token 会在队列里攒着，下次取用时合并成一段
+        q: queue.Queue = queue.Queue()
+        _DONE = object()
 
-        except Exception as e:
-            yield f"对话出错: {str(e)}"
+        def consume():
+            try:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=full_messages,
+                    stream=True,
+                    temperature=0.7
+                )
+                for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        q.put(chunk.choices[0].delta.content)
+            except Exception as e:
+                q.put(f"对话出错: {str(e)}")
+            finally:
+                q.put(_DONE)
+
+        threading.Thread(target=consume, daemon=True).start()
+
+        while True:
+            piece = q.get()
+            if piece is _DONE:
+                return
+            parts = [piece]
+            # 把已到达的 token 一次性抽干，合并后只 yield 一段
+            try:
+                while True:
+                    piece = q.get_nowait()
+                    if piece is _DONE:
+                        yield ''.join(parts)
+                        return
+                    parts.append(piece)
+            except queue.Empty:
+                pass
+            yield ''.join(parts)
 
     def _get_system_prompt(self, user_profile: str = ""):
         base_prompt = """你是一位经验丰富的量化交易员和投资顾问。你的目标是帮助用户制定严格、理性的交易计划。
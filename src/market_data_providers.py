@@ -1,29 +1,82 @@
 from __future__ import annotations
 
+import atexit
+import functools
 import os
+import random
 import time
-import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass
+from datetime import date, datetime, timezone
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
+def _make_session() -> requests.Session:
+    """
+    带连接池和重试的 Session：对同一主机的后续请求复用 TCP+TLS 连接，
+    免掉每次请求重新握手的开销
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# period -> 自然日天数 (留了缓冲覆盖节假日)，模块级常量免得每次调用重建
+_PERIOD_DAYS = {
+    "1mo": 35,
+    "3mo": 120,
+    "6mo": 220,
+    "1y": 420,
+    "2y": 800,
+    "5y": 2000,
+    "10y": 4000,
+    "ytd": 420,
+    "max": 8000,
+}
+
+
+@functools.lru_cache(maxsize=256)
 def _period_to_days(period: str) -> int:
     p = (period or "").lower().strip()
-    mapping = {
-        "1mo": 35,
-        "3mo": 120,
-        "6mo": 220,
-        "1y": 420,
-        "2y": 800,
-        "5y": 2000,
-        "10y": 4000,
-        "ytd": 420,
-        "max": 8000,
-    }
-    return mapping.get(p, 420)
+    return _PERIOD_DAYS.get(p, 420)
+
+
+@functools.lru_cache(maxsize=32)
+def _cutoff_for_period(period: str, day: date) -> np.datetime64:
+    """
+    period 对应的截断时间戳，按 (period, 当日) 缓存：
+    量化到日历日让缓存当天内稳定；datetime64 标量与日期列的
+    ndarray 比较也比 pd.Timestamp 快
+    """
+    return np.datetime64(day) - np.timedelta64(_period_to_days(period), "D")
+
+
+# 常见列名映射
+_RENAME_MAP = {
+    "time_key": "Date",
+    "date": "Date",
+    "datetime": "Date",
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "volume": "Volume",
+}
+
+_CANONICAL_COLS = ["Date", "Open", "High", "Low", "Close", "Volume"]
 
 
 def _normalize_ohlcv_df(df: pd.DataFrame) -> pd.DataFrame:
@@ -33,32 +86,47 @@ def _normalize_ohlcv_df(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty:
         return df
 
-    # 常见列名映射
-    rename_map = {
-        "time_key": "Date",
-        "date": "Date",
-        "datetime": "Date",
-        "open": "Open",
-        "high": "High",
-        "low": "Low",
-        "close": "Close",
-        "volume": "Volume",
-    }
-    df = df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns})
-
-    if "Date" in df.columns:
+    # 快路径：列名/日期类型/价格 dtype 已全部规范
+    # (批量下载会对每只票各调一次，这里是常态而不是例外)
+    if (
+        set(_CANONICAL_COLS).issubset(df.columns)
+        and pd.api.types.is_datetime64_any_dtype(df["Date"])
+        and df["Close"].dtype == np.float32
+    ):
+        return df[_CANONICAL_COLS]
+
+    df = df.rename(columns={k: v for k, v in _RENAME_MAP.items() if k in df.columns})
+
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
 
+    # 价格列统一 float32：精度对日线 OHLC 足够，数组体积减半，
+    # 后面的缓存序列化、指标计算和 Arrow 传输都跟着受益 (Volume 保持原样)
+    for c in ("Open", "High", "Low", "Close"):
+        if c in df.columns and df[c].dtype != np.float32:
+            df[c] = df[c].astype(np.float32)
+
     # 只保留需要的列（如果存在）
-    cols = [c for c in ["Date", "Open", "High", "Low", "Close", "Volume"] if c in df.columns]
+    cols = [c for c in _CANONICAL_COLS if c in df.columns]
     if cols:
         df = df[cols]
     return df
 
 
+# 已是 Futu 格式的前缀 / Yahoo 后缀 -> Futu 代码的转换表
+_FUTU_PREFIXES = frozenset(("US.", "HK.", "SH.", "SZ."))
+_SUFFIX_HANDLERS = {
+    ".HK": lambda c: f"HK.{c.zfill(5)}",
+    ".SS": lambda c: f"SH.{c}",
+    ".SH": lambda c: f"SH.{c}",
+    ".SZ": lambda c: f"SZ.{c}",
+}
+
+
+@functools.lru_cache(maxsize=256)
 def to_futu_code(yahoo_ticker: str) -> str:
     """
-    将 Yahoo/BotInvest 标准格式转换为 Futu code
+    将 Yahoo/BotInvest 标准格式转换为 Futu code (后缀查表分发)
     - AAPL -> US.AAPL
     - 0700.HK/700.HK -> HK.00700
     - 600519.SS -> SH.600519
@@ -69,19 +137,14 @@ def to_futu_code(yahoo_ticker: str) -> str:
         return t
 
     # 已经是 futu
-    if t.startswith(("US.", "HK.", "SH.", "SZ.")):
+    if t[:3] in _FUTU_PREFIXES:
         return t
 
-    if t.endswith(".HK"):
-        code = t.replace(".HK", "")
-        code = code.zfill(5)
-        return f"HK.{code}"
-    if t.endswith(".SS") or t.endswith(".SH"):
-        code = t.split(".")[0]
-        return f"SH.{code}"
-    if t.endswith(".SZ"):
-        code = t.split(".")[0]
-        return f"SZ.{code}"
+    dot = t.rfind(".")
+    if dot > 0:
+        handler = _SUFFIX_HANDLERS.get(t[dot:])
+        if handler is not None:
+            return handler(t[:dot])
     # 默认美股
     return f"US.{t}"
 
@@ -102,13 +165,59 @@ class YahooFinanceProvider(MarketDataProvider):
         self.yf = yf
 
     def get_history(self, yahoo_ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
-        stock = self.yf.Ticker(yahoo_ticker)
-        df = stock.history(period=period, interval=interval)
+        # 限流时指数退避 + 抖动重试，其他异常直接抛给上层
+        last_err: Exception | None = None
+        for attempt in range(3):
+            try:
+                df = self.yf.Ticker(yahoo_ticker).history(period=period, interval=interval)
+                break
+            except Exception as e:
+                msg = str(e)
+                if "Too Many Requests" in msg or "Rate limited" in msg:
+                    last_err = e
+                    time.sleep(0.75 * (2 ** attempt) + random.uniform(0, 0.5))
+                    continue
+                raise
+        else:
+            raise last_err
         if df is None or df.empty:
             return None
         df = df.reset_index()
         return _normalize_ohlcv_df(df)
 
+    def get_history_many(self, tickers: list[str], period: str, interval: str) -> dict:
+        """
+        一次批量请求拉取多只股票的历史K线，返回 {ticker: DataFrame}
+        yf.download 会把整组代码合并成少量 HTTP 请求，
+        拿不到数据的代码不会出现在返回 dict 里
+        """
+        out: dict = {}
+        if not tickers:
+            return out
+        # multi_level_index=False: 单只代码的组返回扁平字段列，
+        # 否则新版 yfinance 连单只也保留 (ticker, field) 两级列，
+        # 下面的 data (单只分支) 会带着两级列进 _normalize_ohlcv_df 被整帧丢弃
+        data = self.yf.download(
+            " ".join(tickers), period=period, interval=interval,
+            group_by="ticker", threads=True, progress=False,
+            multi_level_index=False,
+        )
+        if data is None or data.empty:
+            return out
+        for t in tickers:
+            try:
+                sub = data[t] if len(tickers) > 1 else data
+            except KeyError:
+                continue
+            sub = sub.dropna(how="all")
+            if sub.empty:
+                continue
+            df = _normalize_ohlcv_df(sub.reset_index())
+            if df is not None and not df.empty:
+                df.attrs["data_source"] = "yahoo"
+                out[t] = df
+        return out
+
 
 class FutuQuoteProvider(MarketDataProvider):
     name = "futu"
@@ -144,10 +253,25 @@ class FutuQuoteProvider(MarketDataProvider):
         )
         if ret != self.RET_OK or data is None or data.empty:
             return None
-        df = data.copy()
         # futu: time_key/open/high/low/close/volume
-        df = _normalize_ohlcv_df(df)
-        return df
+        # rename/列子集本身就产出新 DataFrame，前置 copy 纯属多一次整表 memcpy
+        return _normalize_ohlcv_df(data)
+
+    def get_history_many(self, tickers: list[str], period: str, interval: str) -> dict:
+        """
+        复用同一条 OpenD 连接逐只拉取多只股票的K线，返回 {ticker: DataFrame}
+        (OpenD 的历史K线接口本身是单标的，省的是逐只重建连接的握手)
+        """
+        out: dict = {}
+        for t in tickers:
+            try:
+                df = self.get_history(t, period, interval)
+            except Exception as e:
+                print(f"[futu] {t} 获取失败: {e}")
+                continue
+            if df is not None and not df.empty:
+                out[t] = df
+        return out
 
     def close(self):
         try:
@@ -156,6 +280,24 @@ class FutuQuoteProvider(MarketDataProvider):
             pass
 
 
+# (host, port) -> 已建连的 FutuQuoteProvider；OpenQuoteContext 建连较贵，
+# 进程内复用同一条连接，退出时 atexit 统一关闭
+_FUTU_QUOTE_INSTANCES: dict = {}
+
+
+def get_futu_quote_provider(host: str | None = None, port: int | None = None) -> FutuQuoteProvider:
+    key = (
+        host or os.getenv("FUTU_OPEND_HOST", "127.0.0.1"),
+        int(port or os.getenv("FUTU_OPEND_PORT", "11111")),
+    )
+    provider = _FUTU_QUOTE_INSTANCES.get(key)
+    if provider is None:
+        provider = FutuQuoteProvider(host=key[0], port=key[1])
+        _FUTU_QUOTE_INSTANCES[key] = provider
+        atexit.register(provider.close)
+    return provider
+
+
 def probe_futu_quote(host: str, port: int) -> tuple[bool, str]:
     """
     检测 Futu OpenD Quote 是否可用（不需要解锁交易）
@@ -180,6 +322,12 @@ class StooqProvider(MarketDataProvider):
 
     name = "stooq"
 
+    def __init__(self):
+        self._session = _make_session()
+
+    def close(self):
+        self._session.close()
+
     def get_history(self, yahoo_ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         # 仅日线
         if (interval or "1d").lower() not in ("1d", "1day", "day"):
@@ -191,18 +339,26 @@ class StooqProvider(MarketDataProvider):
             return None
         symbol = f"{t.lower()}.us"
         url = f"https://stooq.com/q/d/l/?s={symbol}&i=d"
-        r = requests.get(url, timeout=20)
+        r = self._session.get(url, timeout=20, stream=True)
         if r.status_code != 200:
             return None
-        df = pd.read_csv(io.StringIO(r.text))
+        # 直接从响应流解析，跳过 r.text 把整个响应体物化成 str 的那份拷贝；
+        # dtype/parse_dates 预先声明，省掉 pandas 的类型推断
+        r.raw.decode_content = True
+        df = pd.read_csv(
+            r.raw,
+            engine="c",
+            dtype={"Open": "float32", "High": "float32", "Low": "float32",
+                   "Close": "float32", "Volume": "float64"},
+            parse_dates=["Date"],
+        )
         # stooq columns: Date,Open,High,Low,Close,Volume
         df = _normalize_ohlcv_df(df)
         if df is None or df.empty:
             return None
         # 截取 period 范围
-        days = _period_to_days(period)
-        cutoff = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=days)
-        df = df[df["Date"] >= cutoff]
+        cutoff = _cutoff_for_period(period, datetime.now(timezone.utc).date())
+        df = df[df["Date"].to_numpy() >= cutoff]
         return df
 
 
@@ -211,6 +367,10 @@ class AlphaVantageProvider(MarketDataProvider):
 
     def __init__(self, api_key: str | None = None):
         self.api_key = api_key or os.getenv("ALPHAVANTAGE_API_KEY", "")
+        self._session = _make_session()
+
+    def close(self):
+        self._session.close()
 
     def get_history(self, yahoo_ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         # 仅日线（免费额度也不适合频繁调用）
@@ -227,40 +387,78 @@ class AlphaVantageProvider(MarketDataProvider):
             "apikey": self.api_key,
             "outputsize": "compact",
         }
-        r = requests.get(url, params=params, timeout=25)
+        r = self._session.get(url, params=params, timeout=25)
         if r.status_code != 200:
             return None
         j = r.json()
         key = "Time Series (Daily)"
         if key not in j:
             return None
-        rows = []
-        for dt, v in j[key].items():
-            rows.append(
-                {
-                    "Date": dt,
-                    "Open": float(v.get("1. open", 0)),
-                    "High": float(v.get("2. high", 0)),
-                    "Low": float(v.get("3. low", 0)),
-                    "Close": float(v.get("4. close", 0)),
-                    "Volume": float(v.get("6. volume", 0)),
-                }
+        # 整个时间序列一次性构表，数值转换走 pandas 的 C 路径，
+        # 不再逐行建 dict + 逐字段 float()
+        df = pd.DataFrame.from_dict(j[key], orient="index")
+        df.columns = df.columns.str[3:]  # 去掉 "1. " 之类的序号前缀
+        try:
+            df = df[["open", "high", "low", "close", "volume"]].astype(
+                {"open": "float32", "high": "float32", "low": "float32",
+                 "close": "float32", "volume": "float64"}
             )
-        df = pd.DataFrame(rows)
+        except KeyError:
+            return None
+        df.index.name = "Date"
+        df.reset_index(inplace=True)
         df = _normalize_ohlcv_df(df)
         df = df.sort_values("Date")
         # 截取 period
-        days = _period_to_days(period)
-        cutoff = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=days)
-        df = df[df["Date"] >= cutoff]
+        cutoff = _cutoff_for_period(period, datetime.now(timezone.utc).date())
+        df = df[df["Date"].to_numpy() >= cutoff]
         return df
 
 
+class MultiProviderFetcher:
+    """
+    多数据源并发竞速：同时向所有 provider 发请求，取最先返回的有效结果。
+    主源抖动时，拿到首个可用数据的时间从各源超时之和降到最快一源的耗时
+    """
+
+    def __init__(self, providers: list[MarketDataProvider]):
+        self.providers = [p for p in providers if p is not None]
+
+    def get_history_first_success(
+        self, yahoo_ticker: str, period: str, interval: str, timeout: float = 10.0
+    ) -> Optional[pd.DataFrame]:
+        if not self.providers:
+            return None
+
+        ex = ThreadPoolExecutor(max_workers=len(self.providers))
+        try:
+            futures = {
+                ex.submit(p.get_history, yahoo_ticker, period, interval): p
+                for p in self.providers
+            }
+            for fut in as_completed(futures, timeout=timeout):
+                provider = futures[fut]
+                try:
+                    df = fut.result()
+                except Exception as e:
+                    print(f"[{provider.name}] 获取失败: {e}")
+                    continue
+                if df is not None and not df.empty:
+                    df.attrs.setdefault("data_source", provider.name)
+                    return df
+        except FuturesTimeoutError:
+            print(f"[multi] {yahoo_ticker} 所有数据源在 {timeout}s 内均未返回有效数据")
+        finally:
+            # 不等慢源跑完：取消未开始的，已在跑的留给后台线程自行结束
+            ex.shutdown(wait=False, cancel_futures=True)
+        return None
+
+
 def get_provider(provider_name: str) -> Optional[MarketDataProvider]:
     name = (provider_name or "auto").lower().strip()
     if name in ("futu", "futu_quote", "futuquote"):
         try:
-            return FutuQuoteProvider()
+            return get_futu_quote_provider()
         except Exception:
             return None
     if name in ("yahoo", "yf", "yfinance"):
@@ -1,6 +1,8 @@
-import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from data_loader import DataLoader
 from analysis import TechnicalAnalyzer
+from market_data_providers import YahooFinanceProvider
 from stock_pool import StockPool
 
 class Screener:
@@ -8,9 +10,70 @@ class Screener:
         self.loader = DataLoader()
         self.pool = StockPool()
 
-    def run_screener(self, progress_callback=None):
+    def _prefetch_histories(self, tickers):
+        """
+        按交易所分组批量下载历史K线 (每组一次 yf.download)，
+        几十次逐只 HTTPS 往返压缩成每个市场一次批量请求。
+        返回 {ticker: DataFrame}；缺失的代码由调用方走逐只回退
+        """
+        prefetched = {}
+        try:
+            provider = YahooFinanceProvider()
+        except Exception:
+            return prefetched
+
+        groups = {}
+        for t in tickers:
+            market = t.rsplit('.', 1)[-1] if '.' in t else 'US'
+            groups.setdefault(market, []).append(t)
+
+        for market, tks in groups.items():
+            try:
+                prefetched.update(provider.get_history_many(tks, period="6mo", interval="1d"))
+            except Exception as e:
+                print(f"[screener] {market} 批量下载失败: {e}")
+        return prefetched
+
+    def _analyze_one(self, ticker, df=None):
+        """
+        拉取并计算单只股票的指标，返回末两根的标量摘要
+        (price, sma20, sma60, rsi, prev_close, prev_sma20)；
+        数据不足/获取失败返回 None。分类在 run_screener 里统一用掩码算
+        """
+        if df is None:
+            # 获取数据 (使用较短周期以加快速度，但为了MA60需要至少3个月)；
+            # 选股扫描当天内可复用，显式启用本地 parquet 缓存
+            df = self.loader.get_stock_history(ticker, period="6mo", use_disk_cache=True)
+
+        if df is None or df.empty or len(df) < 60:
+            return None
+
+        # 计算指标
+        analyzer = TechnicalAnalyzer(df)
+        analyzer.add_sma(period=20)
+        analyzer.add_sma(period=60)
+        analyzer.add_rsi(period=14)
+        df_res = analyzer.get_analysis()
+
+        # 整列取成 ndarray 再取尾部标量，省掉 iloc[-1]/iloc[-2] 各构造一个 Series
+        close_a = df_res['Close'].to_numpy()
+        sma20_a = df_res['SMA_20'].to_numpy()
+
+        return (
+            float(close_a[-1]),
+            float(sma20_a[-1]),
+            float(df_res['SMA_60'].to_numpy()[-1]),
+            float(df_res['RSI'].to_numpy()[-1]),
+            float(close_a[-2]),
+            float(sma20_a[-2]),
+        )
+
+    def run_screener(self, progress_callback=None, max_workers_per_market=4):
         """
         运行选股器
+        瓶颈在逐只股票的行情请求 (网络 IO)。每个市场 (US/HK) 各开一个小线程池：
+        不同交易所的行情端点互相独立，可并行；单一主机的并发保持保守，
+        不容易触发 Yahoo 的 429 限流
         :param progress_callback: 回调函数，用于更新 UI 进度条 (current, total, current_ticker)
         """
         tickers = self.pool.get_all_tickers()
@@ -19,61 +82,73 @@ class Screener:
             "short_term": [], # 适合短期交易的
             "watch_list": []  # 其他值得关注的
         }
-        
+
         total = len(tickers)
-        
-        for i, ticker in enumerate(tickers):
-            if progress_callback:
-                progress_callback(i, total, ticker)
-                
-            # 获取数据 (使用较短周期以加快速度，但为了MA60需要至少3个月)
-            df = self.loader.get_stock_history(ticker, period="6mo")
-            
-            if df is None or df.empty or len(df) < 60:
-                continue
-                
-            # 计算指标
-            analyzer = TechnicalAnalyzer(df)
-            analyzer.add_sma(period=20)
-            analyzer.add_sma(period=60)
-            analyzer.add_rsi(period=14)
-            df_res = analyzer.get_analysis()
-            
-            latest = df_res.iloc[-1]
-            prev = df_res.iloc[-2]
-            
-            price = latest['Close']
-            sma20 = latest['SMA_20']
-            sma60 = latest['SMA_60']
-            rsi = latest['RSI']
-            
-            # --- 筛选逻辑 ---
-            
-            item = {
-                "ticker": ticker,
-                "price": price,
-                "rsi": rsi,
-                "trend": "Bullish" if price > sma60 else "Bearish"
+        if total == 0:
+            return results
+
+        # 先批量预取，线程池里剩下的网络请求只有批量拉不到的零头
+        prefetched = self._prefetch_histories(tickers)
+
+        analyzed = {}
+        executors = []
+        futures = {}
+        try:
+            for market, tks in self.pool.get_tickers_by_market().items():
+                if not tks:
+                    continue
+                ex = ThreadPoolExecutor(max_workers=min(max_workers_per_market, len(tks)))
+                executors.append(ex)
+                for t in tks:
+                    futures[ex.submit(self._analyze_one, t, prefetched.get(t))] = t
+
+            for i, fut in enumerate(as_completed(futures)):
+                ticker = futures[fut]
+                if progress_callback:
+                    progress_callback(i, total, ticker)
+                try:
+                    analyzed[ticker] = fut.result()
+                except Exception as e:
+                    print(f"[screener] {ticker} 分析失败: {e}")
+                    analyzed[ticker] = None
+        finally:
+            for ex in executors:
+                ex.shutdown()
+
+        # 分类：按股票池原顺序把摘要标量摊成列数组，
+        # 筛选条件变成几次向量化比较，不再每票走一遍 if/elif
+        ok_tickers = [t for t in tickers if analyzed.get(t) is not None]
+        if not ok_tickers:
+            return results
+
+        arr = np.array([analyzed[t] for t in ok_tickers], dtype=np.float64)
+        price, sma20, sma60, rsi, prev_close, prev_sma20 = arr.T
+
+        # 1. 长期潜力: 价格在 60日均线之上 (长期趋势好) 且 RSI 适中 (没有被炒作过头)
+        long_mask = (price > sma60) & (rsi > 40) & (rsi < 70)
+        # 2. 短期机会: 超卖反弹 或 突破 20日均线 (与原 if/elif 同序，长线优先)
+        oversold = ~long_mask & (rsi < 30)
+        breakout = ~long_mask & ~oversold & (price > sma20) & (prev_close <= prev_sma20)
+
+        def item(i, reason=None):
+            d = {
+                "ticker": ok_tickers[i],
+                "price": price[i],
+                "rsi": rsi[i],
+                "trend": "Bullish" if price[i] > sma60[i] else "Bearish"
             }
-            
-            # 1. 长期潜力 (趋势向上 + 健康回调)
-            # 价格在 60日均线之上 (长期趋势好) 且 RSI 适中 (没有被炒作过头)
-            if price > sma60 and 40 < rsi < 70:
-                item['reason'] = "长期上升趋势稳健，估值适中"
-                results['long_term'].append(item)
-                
-            # 2. 短期机会 (超卖反弹 或 突破)
-            # 超卖
-            elif rsi < 30:
-                item['reason'] = "RSI超卖 (<30)，存在反弹需求"
-                results['short_term'].append(item)
-            # 突破
-            elif price > sma20 and prev['Close'] <= prev['SMA_20']:
-                 item['reason'] = "放量突破 20日均线"
-                 results['short_term'].append(item)
-                 
+            if reason:
+                d['reason'] = reason
+            return d
+
+        for i in range(len(ok_tickers)):
+            if long_mask[i]:
+                results['long_term'].append(item(i, "长期上升趋势稳健，估值适中"))
+            elif oversold[i]:
+                results['short_term'].append(item(i, "RSI超卖 (<30)，存在反弹需求"))
+            elif breakout[i]:
+                results['short_term'].append(item(i, "放量突破 20日均线"))
             else:
-                results['watch_list'].append(item)
-                
-        return results
+                results['watch_list'].append(item(i))
 
+        return results
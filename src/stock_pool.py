@@ -21,3 +21,9 @@ class StockPool:
     def get_all_tickers(self):
         return self.us_stocks + self.hk_stocks
 
+    def get_tickers_by_market(self):
+        """
+        按市场分组返回关注列表: {'US': [...], 'HK': [...]}
+        """
+        return {"US": list(self.us_stocks), "HK": list(self.hk_stocks)}
+
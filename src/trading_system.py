@@ -1,24 +1,89 @@
 import json
 import os
+import numpy as np
 import pandas as pd
+from contextlib import contextmanager
 from datetime import datetime
 from data_loader import DataLoader
 
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+
+def _dump_json(path: str, data) -> None:
+    """写 JSON 文件，优先 orjson (C 实现，直接输出 bytes)"""
+    if _HAS_ORJSON:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def _load_json(path: str):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if _HAS_ORJSON else json.loads(raw)
+
+
+def _dumps_line(entry: dict) -> str:
+    if _HAS_ORJSON:
+        return orjson.dumps(entry).decode()
+    return json.dumps(entry, ensure_ascii=False)
+
+
+_loads = orjson.loads if _HAS_ORJSON else json.loads
+
+
+def _migrate_positions(positions: dict) -> dict:
+    """旧记录存 avg_cost (派生值)，载入时换算成运行累计 total_cost"""
+    for pos in positions.values():
+        if 'total_cost' not in pos and 'avg_cost' in pos:
+            pos['total_cost'] = pos['qty'] * pos.pop('avg_cost')
+    return positions
+
 class TradingAccount:
     def __init__(self, initial_cash: float = 100000.0):
         self.cash = initial_cash
         self.positions = {} # {ticker: {"qty": 0, "avg_cost": 0.0}}
         self.history = []   # [{"date":..., "action":..., "ticker":..., "price":..., "qty":...}]
         
+    @staticmethod
+    def _avg_cost(pos: dict) -> float:
+        """
+        单仓平均成本。PaperTrader 存运行累计 total_cost (读时现算均价)，
+        FutuTrader 等外部账户仍直接给 avg_cost，两种 schema 都兼容
+        """
+        if 'total_cost' in pos:
+            qty = pos['qty']
+            return pos['total_cost'] / qty if qty else 0.0
+        return pos.get('avg_cost', 0.0)
+
+    def positions_arrays(self):
+        """
+        持仓的 SoA 视图: (tickers, qty 数组, avg_cost 数组)
+        把 dict-of-dicts 摊平成列数组，估值/盈亏就可以走向量化计算
+        """
+        tickers = list(self.positions.keys())
+        n = len(tickers)
+        qty = np.fromiter((self.positions[t]['qty'] for t in tickers), dtype=np.float64, count=n)
+        avg_cost = np.fromiter((self._avg_cost(self.positions[t]) for t in tickers), dtype=np.float64, count=n)
+        return tickers, qty, avg_cost
+
     def total_value(self, current_prices: dict) -> float:
         """
         计算总资产 (现金 + 持仓市值)
         """
-        market_value = 0.0
-        for ticker, pos in self.positions.items():
-            price = current_prices.get(ticker, pos['avg_cost']) # 如果没拿到现价，暂时用成本价估算
-            market_value += pos['qty'] * price
-        return self.cash + market_value
+        tickers, qty, avg_cost = self.positions_arrays()
+        if not tickers:
+            return self.cash
+        # 如果没拿到现价，暂时用成本价估算
+        prices = np.fromiter((current_prices.get(t, c) for t, c in zip(tickers, avg_cost)),
+                             dtype=np.float64, count=len(tickers))
+        return self.cash + float(qty @ prices)
 
 class BaseTrader:
     def buy(self, ticker: str, qty: int, price: float): raise NotImplementedError
@@ -28,32 +93,82 @@ class BaseTrader:
 class PaperTrader(BaseTrader):
     """
     本地模拟交易器 - 将数据保存在 JSON 文件中
+    存储分成两片：状态文件 (现金+持仓，小，整写) 和 append-only 的
+    历史文件 (每笔一行)，每笔交易的写盘量从 O(历史长度) 降到 O(1)
     """
     def __init__(self, data_file="portfolio.json"):
         self.data_file = data_file
+        base = os.path.splitext(data_file)[0]
+        self.state_file = base + "_state.json"
+        self.history_file = base + "_history.jsonl"
+        self._in_batch = False
         self.account = self._load_account()
 
     def _load_account(self) -> TradingAccount:
+        # 新版分片存储
+        if os.path.exists(self.state_file):
+            try:
+                data = _load_json(self.state_file)
+                acc = TradingAccount(data.get('cash', 100000.0))
+                acc.positions = _migrate_positions(data.get('positions', {}))
+                acc.history = self._load_history()
+                return acc
+            except Exception:
+                return TradingAccount()
+
+        # 旧版单文件：读出后迁移到分片格式
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    acc = TradingAccount(data.get('cash', 100000.0))
-                    acc.positions = data.get('positions', {})
-                    acc.history = data.get('history', [])
-                    return acc
+                data = _load_json(self.data_file)
+                acc = TradingAccount(data.get('cash', 100000.0))
+                acc.positions = _migrate_positions(data.get('positions', {}))
+                acc.history = data.get('history', [])
+                self._write_state(acc)
+                with open(self.history_file, 'w', encoding='utf-8') as f:
+                    for entry in acc.history:
+                        f.write(_dumps_line(entry) + "\n")
+                return acc
             except Exception:
                 return TradingAccount()
         return TradingAccount()
 
-    def _save_account(self):
+    def _load_history(self) -> list:
+        history = []
+        if os.path.exists(self.history_file):
+            try:
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            history.append(_loads(line))
+            except Exception:
+                pass
+        return history
+
+    def _write_state(self, account: TradingAccount):
         data = {
-            "cash": self.account.cash,
-            "positions": self.account.positions,
-            "history": self.account.history
+            "cash": account.cash,
+            "positions": account.positions
         }
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        _dump_json(self.state_file, data)
+
+    def _save_account(self):
+        if self._in_batch:
+            return
+        self._write_state(self.account)
+
+    @contextmanager
+    def batch(self):
+        """
+        批量交易事务：with trader.batch(): 内的 buy/sell 不逐笔写状态文件，
+        退出时统一落盘一次 (历史仍是逐笔追加，本来就是 O(1))
+        """
+        self._in_batch = True
+        try:
+            yield self
+        finally:
+            self._in_batch = False
+            self._save_account()
 
     def buy(self, ticker: str, qty: int, price: float):
         cost = qty * price
@@ -62,17 +177,16 @@ class PaperTrader(BaseTrader):
         
         # 扣款
         self.account.cash -= cost
-        
-        # 更新持仓
+
+        # 更新持仓：只累加运行总成本，均价读取时派生，
+        # 多次分批买入不会因反复 乘/除 损失精度
         if ticker not in self.account.positions:
-            self.account.positions[ticker] = {"qty": 0, "avg_cost": 0.0}
-            
+            self.account.positions[ticker] = {"qty": 0, "total_cost": 0.0}
+
         pos = self.account.positions[ticker]
-        # 重新计算平均成本
-        total_cost = (pos['qty'] * pos['avg_cost']) + cost
         pos['qty'] += qty
-        pos['avg_cost'] = total_cost / pos['qty']
-        
+        pos['total_cost'] += cost
+
         # 记录历史
         self._log_trade("BUY", ticker, qty, price)
         self._save_account()
@@ -87,9 +201,11 @@ class PaperTrader(BaseTrader):
         # 收款
         self.account.cash += income
         
-        # 更新持仓
+        # 更新持仓 (按均价等比释放成本)
         pos = self.account.positions[ticker]
+        avg = TradingAccount._avg_cost(pos)
         pos['qty'] -= qty
+        pos['total_cost'] = pos.get('total_cost', 0.0) - avg * qty
         if pos['qty'] == 0:
             del self.account.positions[ticker]
             
@@ -99,14 +215,18 @@ class PaperTrader(BaseTrader):
         return True, "卖出成功"
 
     def _log_trade(self, action, ticker, qty, price):
-        self.account.history.append({
+        entry = {
             "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "action": action,
             "ticker": ticker,
             "qty": qty,
             "price": price,
             "amount": qty * price
-        })
+        }
+        self.account.history.append(entry)
+        # 逐笔追加一行，不重写整个历史
+        with open(self.history_file, 'a', encoding='utf-8') as f:
+            f.write(_dumps_line(entry) + "\n")
 
     def get_account(self) -> TradingAccount:
         return self.account